@@ -0,0 +1,104 @@
+"""Append-only log of trial results, so that a crash during the experiment
+loses at most the trials since the last sync instead of all of them."""
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+
+class TrialLog:
+    """Write one JSON line per trial from a background thread. append() only puts the
+    row into a bounded queue, so the display loop never waits for the disk. The thread
+    creates the log's directory, writes the rows and flushes and syncs them to disk
+    (os.fsync) at most once every `fsync_interval` seconds. An error in the thread is
+    raised by the next call to append() or close()."""
+
+    def __init__(self, fname, fsync_interval=1.0, max_queue=1000):
+        self.fname = fname
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.error = None
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, row):
+        self._put(row)
+
+    def close(self):
+        """Write all remaining rows and wait for the thread to finish."""
+        if self.thread.is_alive():
+            self._put(None)  # tells the thread to stop
+            self.thread.join()
+        self._raise_error()
+
+    def _put(self, row):
+        while True:
+            self._raise_error()
+            try:
+                self.queue.put(row, timeout=0.1)
+                return
+            except queue.Full:  # check if the thread is still alive, then try again
+                pass
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"Writing to {self.fname} failed!") from self.error
+
+    def _write(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.fname)), exist_ok=True)
+            with open(self.fname, "a", buffering=2**16) as f:
+                if _ends_with_partial_line(self.fname):  # a previous run crashed while writing
+                    f.write("\n")
+                last_sync, unsynced = time.monotonic(), False
+                while True:
+                    try:
+                        row = self.queue.get(timeout=self.fsync_interval)
+                        if row is None:
+                            break
+                        f.write(json.dumps(row) + "\n")
+                        unsynced = True
+                    except queue.Empty:  # nothing new, but sync what was written before
+                        pass
+                    if unsynced and time.monotonic() - last_sync >= self.fsync_interval:
+                        f.flush()
+                        os.fsync(f.fileno())
+                        last_sync, unsynced = time.monotonic(), False
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as error:
+            self.error = error
+
+
+def _ends_with_partial_line(fname):
+    if os.path.getsize(fname) == 0:
+        return False
+    with open(fname, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def compact(log_fname, out_fname):
+    """Turn a trial log into a CSV file with one row per trial. Incomplete lines
+    (e.g. from a crash while writing) are skipped."""
+    rows = []
+    with open(log_fname) as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    with open(out_fname, "w", newline="") as f:
+        if rows:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
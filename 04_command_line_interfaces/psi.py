@@ -0,0 +1,118 @@
+"""Bayesian adaptive threshold estimation with the Psi method (Kontsevich & Tyler, 1999)."""
+import json
+import numpy as np
+
+
+class Psi:
+    """Estimate the detection threshold and slope of a yes/no psychometric function.
+    The posterior over a grid of thresholds and slopes is updated after every trial
+    and the next level is the one where the response is expected to give the most
+    information about them. Has the same interface as staircase.Staircase: present
+    the stimulus at `level` and pass the response to `update()` until `finished`
+    is True, then call `threshold()`.
+
+    The psychometric function is a logistic with the given false alarm (guess) and
+    lapse rate: p(yes) = guess + (1 - guess - lapse) / (1 + exp(-slope * (level - threshold))).
+    Testing stops after `n_trials` or as soon as the posterior standard deviation of
+    the threshold is below `sd_stop`.
+
+    A trial costs about 50 matrix-vector products over the threshold x slope grid,
+    on a single core that takes about 0.1 ms for the default grid and 0.4 ms for
+    201 thresholds x 50 slopes (the cost grows with the product of both)."""
+
+    def __init__(
+        self,
+        levels=np.linspace(0, 1, 101),
+        thresholds=np.linspace(0, 1, 101),
+        slopes=np.geomspace(5, 200, 40),
+        guess=0.02,
+        lapse=0.02,
+        n_trials=40,
+        sd_stop=0.0,
+    ):
+        self.params = {
+            "levels": np.asarray(levels, dtype=float).tolist(),
+            "thresholds": np.asarray(thresholds, dtype=float).tolist(),
+            "slopes": np.asarray(slopes, dtype=float).tolist(),
+            "guess": guess,
+            "lapse": lapse,
+            "n_trials": n_trials,
+            "sd_stop": sd_stop,
+        }
+        self.levels = np.asarray(levels, dtype=float)
+        grid_t, grid_s = np.meshgrid(thresholds, slopes, indexing="ij")
+        self.grid_t, self.grid_s = grid_t.ravel(), grid_s.ravel()
+        # p(yes) for every level (rows) and every combination of threshold and slope (columns)
+        logistic = 1 / (1 + np.exp(-self.grid_s * (self.levels[:, np.newaxis] - self.grid_t)))
+        p_yes = guess + (1 - guess - lapse) * logistic
+        # entropy of the response for every level and parameter combination
+        entropy = -(p_yes * np.log(p_yes) + (1 - p_yes) * np.log(1 - p_yes))
+        # choosing the next level reads both tables once per trial, in float32 that takes half the time
+        self.p_yes, self.entropy = p_yes.astype(np.float32), entropy.astype(np.float32)
+        # the next level is searched among every `step`-th level first and then refined
+        # around the best one, so a trial costs about as much as with 50 levels
+        self.step = max(1, len(self.levels) // 50)
+        self.coarse = np.arange(0, len(self.levels), self.step)
+        self.coarse_p_yes, self.coarse_entropy = self.p_yes[self.coarse], self.entropy[self.coarse]
+        self.posterior = np.full(self.grid_t.size, 1 / self.grid_t.size)  # flat prior
+        self.history = []  # (level, response) of every trial
+        self._next_level()
+
+    @property
+    def finished(self):
+        return len(self.history) >= self.params["n_trials"] or self.threshold_sd() < self.params["sd_stop"]
+
+    def update(self, heard):
+        """Update the posterior with the response to the current level and pick the next level."""
+        self.history.append((self.level, heard))
+        likelihood = self.p_yes[self.level_index] if heard else 1 - self.p_yes[self.level_index]
+        self.posterior *= likelihood
+        self.posterior /= self.posterior.sum()
+        self._next_level()
+
+    def threshold(self):
+        """Posterior mean of the threshold."""
+        return float(self.posterior @ self.grid_t)
+
+    def threshold_sd(self):
+        return float(np.sqrt(self.posterior @ (self.grid_t - self.threshold()) ** 2))
+
+    def slope(self):
+        """Posterior mean of the slope."""
+        return float(self.posterior @ self.grid_s)
+
+    def _next_level(self):
+        posterior = self.posterior.astype(np.float32)
+        best = self.coarse[np.argmax(self._information(self.coarse_p_yes, self.coarse_entropy, posterior))]
+        fine = np.arange(max(best - self.step + 1, 0), min(best + self.step, len(self.levels)))
+        self.level_index = int(fine[np.argmax(self._information(self.p_yes[fine], self.entropy[fine], posterior))])
+        self.level = float(self.levels[self.level_index])
+
+    @staticmethod
+    def _information(p_yes, entropy, posterior):
+        # the expected information of a response is the entropy of its predicted
+        # probability minus the expected entropy given the parameters
+        p = np.clip(p_yes @ posterior, 1e-6, 1 - 1e-6)
+        return -(p * np.log(p) + (1 - p) * np.log(1 - p)) - entropy @ posterior
+
+    def to_dict(self):
+        return {"params": dict(self.params), "history": [list(h) for h in self.history]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Recreate the estimator by replaying its history."""
+        psi = cls(**data["params"])
+        for level, heard in data["history"]:
+            psi.level_index = int(np.argmin(np.abs(psi.levels - level)))
+            psi.level = float(psi.levels[psi.level_index])
+            psi.update(heard)
+        return psi
+
+    def save(self, fname):
+        with open(fname, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def load(cls, fname):
+        with open(fname) as f:
+            return cls.from_dict(json.load(f))
@@ -1,6 +1,9 @@
 from psychopy.sound import Sound
 from psychopy.visual import Window, TextStim
 from psychopy.event import waitKeys
+from tones import pure_tones, SAMPLE_RATE
+from staircase import Staircase
+from psi import Psi
 
 ###  Define Parameters ####
 FREQUENCY = 1000  # frequency of the pure tone
@@ -10,6 +13,11 @@ KEY_YES = "y" # key to press if the tone was heard
 KEY_NO = "n" # key to press if the tone was not head
 START_VOLUME = 0.8 # starting intensity of the tone
 STEP_SIZE = 0.1 # step size of the staircase
+N_DOWN = 1 # number of "yes" responses in a row before the volume goes down (2 for a 2-down-1-up staircase)
+SHRINK = 1.0 # factor by which the step size changes after every reversal
+MIN_STEP = 0.01 # smallest step size
+METHOD = "staircase" # "staircase" or "psi" for Bayesian adaptive testing, which needs fewer trials
+N_TRIALS = 30 # number of trials with the psi method
 
 instructions = "Press " + KEY_YES + " if you heard the tone and " + KEY_NO + " if you didn't!"
 #### Run Experiment ####
@@ -20,27 +28,25 @@ with Window() as win:
     text.draw()
     win.flip()
 
-    # create tone
-    tone = Sound(value=FREQUENCY, secs=SECS, volume=START_VOLUME, stereo=False)
+    # create tone from ramped samples, so psychopy does not have to synthesize it
+    tone = Sound(
+        value=pure_tones(FREQUENCY, SECS), sampleRate=SAMPLE_RATE, hamming=False, volume=START_VOLUME, stereo=False
+    )
 
-    # start the staircase
-    reversals=[]
-    direction=-1  # directon of the staircae
-    while len(reversals) < N_REVERSALS:
+    # start the staircase (or the psi method, which has the same interface)
+    if METHOD == "psi":
+        staircase = Psi(n_trials=N_TRIALS)
+    else:
+        staircase = Staircase(
+            START_VOLUME, STEP_SIZE, N_REVERSALS, n_down=N_DOWN, shrink=SHRINK, min_step=MIN_STEP, min_level=0, max_level=1
+        )
+    while not staircase.finished:
+        tone.setVolume(staircase.level)
         tone.play()
         keys = waitKeys(keyList=[KEY_NO, KEY_YES])
-        if keys[0] == KEY_NO: # increase volume if key was not heard
-            if direction == -1:
-                direction = 1
-                reversals.append(tone.volume) # append current level
-            tone.setVolume(tone.volume+STEP_SIZE)
-        else: # decrease volume if key was heard
-            if direction == 1:
-                direction = -1
-                reversals.append(tone.volume) # append current level
-            tone.setVolume(tone.volume-STEP_SIZE)
+        staircase.update(heard=keys[0] == KEY_YES) # volume goes down if the tone was heard and up if not
     
-    threshold = round(sum(reversals)/len(reversals), 3) # compute threshold by averaging reversals
+    threshold = round(staircase.threshold(), 3) # mean of the reversals or of the posterior
     print("The detection threshold for " + str(FREQUENCY) + " Hz is: " + str(threshold))
         
 
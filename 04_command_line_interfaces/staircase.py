@@ -0,0 +1,113 @@
+"""Adaptive staircases for yes/no detection tasks like pure_tone_audiogram.py."""
+import json
+
+
+class Staircase:
+    """Staircase that lowers the level after `n_down` consecutive "yes" responses and
+    raises it after `n_up` consecutive "no" responses. The defaults give the simple
+    1-up-1-down staircase, n_down=2 gives the transformed 2-down-1-up staircase and
+    up_ratio != 1 gives a weighted staircase whose steps up are up_ratio times larger
+    than its steps down. After every reversal, the step size is multiplied by
+    `shrink` (but never gets smaller than `min_step`). The staircase is done after
+    `n_reversals` reversals and the threshold is the mean level at the reversals.
+
+    In every trial, present the stimulus at `level` and pass the response to
+    `update()` until `finished` is True, then call `threshold()`."""
+
+    def __init__(
+        self,
+        start,
+        step,
+        n_reversals=5,
+        n_down=1,
+        n_up=1,
+        up_ratio=1.0,
+        shrink=1.0,
+        min_step=0.0,
+        min_level=None,
+        max_level=None,
+    ):
+        self.params = {
+            "start": start,
+            "step": step,
+            "n_reversals": n_reversals,
+            "n_down": n_down,
+            "n_up": n_up,
+            "up_ratio": up_ratio,
+            "shrink": shrink,
+            "min_step": min_step,
+            "min_level": min_level,
+            "max_level": max_level,
+        }
+        self.level = start
+        self.step = step
+        self.direction = -1  # start by going down
+        self.n_yes, self.n_no = 0, 0  # consecutive responses of each kind
+        self.reversals = []  # levels at which the staircase changed direction
+        self.history = []  # (level, response) of every trial
+
+    @classmethod
+    def weighted(cls, start, step, target=0.75, **kwargs):
+        """Weighted up-down staircase that converges on the level that is detected
+        with probability `target` (Kaernbach, 1991)."""
+        return cls(start, step, up_ratio=target / (1 - target), **kwargs)
+
+    @property
+    def finished(self):
+        return len(self.reversals) >= self.params["n_reversals"]
+
+    def update(self, heard):
+        """Record the response to the current level and move to the next one."""
+        self.history.append((self.level, heard))
+        if heard:
+            self.n_yes, self.n_no = self.n_yes + 1, 0
+            if self.n_yes < self.params["n_down"]:
+                return
+            direction = -1
+        else:
+            self.n_yes, self.n_no = 0, self.n_no + 1
+            if self.n_no < self.params["n_up"]:
+                return
+            direction = 1
+        self.n_yes, self.n_no = 0, 0
+        if direction != self.direction:
+            self.direction = direction
+            self.reversals.append(self.level)
+            self.step = max(self.step * self.params["shrink"], self.params["min_step"])
+        if direction == 1:
+            self.level += self.step * self.params["up_ratio"]
+        else:
+            self.level -= self.step
+        if self.params["min_level"] is not None:
+            self.level = max(self.level, self.params["min_level"])
+        if self.params["max_level"] is not None:
+            self.level = min(self.level, self.params["max_level"])
+
+    def threshold(self, n_skip=0):
+        """Mean level at the reversals, leaving out the first `n_skip` reversals."""
+        reversals = self.reversals[n_skip:]
+        if not reversals:
+            raise ValueError("The staircase has no reversals to compute a threshold from!")
+        return sum(reversals) / len(reversals)
+
+    def to_dict(self):
+        state = {key: getattr(self, key) for key in ["level", "step", "direction", "n_yes", "n_no"]}
+        state["reversals"], state["history"] = list(self.reversals), [list(h) for h in self.history]
+        return {"params": dict(self.params), "state": state}
+
+    @classmethod
+    def from_dict(cls, data):
+        staircase = cls(**data["params"])
+        for key, value in data["state"].items():
+            setattr(staircase, key, value)
+        staircase.history = [tuple(h) for h in staircase.history]
+        return staircase
+
+    def save(self, fname):
+        with open(fname, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def load(cls, fname):
+        with open(fname) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,54 @@
+"""Synthesize tones as float32 NumPy arrays that can be passed to Sound(value=...).
+Pass hamming=False to Sound, because the arrays already have their on- and off-ramps."""
+from functools import lru_cache
+import numpy as np
+
+SAMPLE_RATE = 44100  # samples per second
+RAMP_DUR = 0.01  # duration of the on- and off-ramps in seconds
+
+
+def pure_tones(frequencies, duration, sample_rate=SAMPLE_RATE, ramp_dur=RAMP_DUR):
+    """Return one ramped tone per frequency. For a single frequency, the result has
+    the shape (n_samples,), for a list of frequencies it has the shape
+    (n_frequencies, n_samples), all computed in one broadcasted call."""
+    times = _times(duration, sample_rate)
+    tones = np.sin(2 * np.pi * np.multiply.outer(frequencies, times)).astype(np.float32)
+    return tones * _ramp(len(times), int(ramp_dur * sample_rate))
+
+
+def tone_complex(frequencies, duration, amplitudes=None, sample_rate=SAMPLE_RATE, ramp_dur=RAMP_DUR):
+    """Return the sum of several pure tones, scaled so that its peak is at most 1."""
+    tones = pure_tones(np.atleast_1d(frequencies), duration, sample_rate, ramp_dur)  # always 2-D
+    if amplitudes is not None:
+        tones *= np.atleast_1d(np.asarray(amplitudes, dtype=np.float32))[:, np.newaxis]
+    sound = tones.sum(axis=0)
+    peak = np.abs(sound).max()
+    if peak > 1:
+        sound /= peak
+    return sound
+
+
+def apply_ramp(sound, sample_rate=SAMPLE_RATE, ramp_dur=RAMP_DUR):
+    """Return a copy of the sound (or sounds, one per row) with on- and off-ramps."""
+    sound = np.asarray(sound, dtype=np.float32)
+    return sound * _ramp(sound.shape[-1], int(ramp_dur * sample_rate))
+
+
+@lru_cache(maxsize=32)
+def _times(duration, sample_rate):
+    # the time of every sample, computed once for every duration
+    times = np.arange(int(duration * sample_rate)) / sample_rate
+    times.flags.writeable = False  # shared between calls
+    return times
+
+
+@lru_cache(maxsize=32)
+def _ramp(n_samples, n_ramp):
+    # envelope that rises with the first half of a Hanning window and falls with the second half
+    n_ramp = min(n_ramp, n_samples // 2)
+    envelope = np.ones(n_samples, dtype=np.float32)
+    window = np.hanning(2 * n_ramp).astype(np.float32)
+    envelope[:n_ramp] = window[:n_ramp]
+    envelope[n_samples - n_ramp:] = window[n_ramp:]
+    envelope.flags.writeable = False  # shared between calls
+    return envelope
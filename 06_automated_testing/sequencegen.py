@@ -1,34 +1,369 @@
+import json
+import mmap
+import os
 import random
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
+try:
+    import numpy as np
+except ImportError:  # has_repetitions falls back to pure Python
+    np = None
 
-def make_sequence(conditions, n_trials, min_dist=0, max_iter=1000):
+
+def make_sequence(conditions, n_trials, min_dist=0, max_iter=1000, rng=None):
+    if rng is None:  # a random.Random instance, the random module's global one by default
+        rng = random
+    n_reps = int(n_trials / len(conditions))
+    if min_dist < 1:
+        trials = conditions * n_reps
+        rng.shuffle(trials)
+        return trials
+    labels, counts = _count_conditions(conditions, n_reps)
+    if not is_feasible(counts, min_dist):
+        raise StopIteration(
+            f"No sequence of {sum(counts)} trials without repetitions within {min_dist} trials exists!"
+        )
+    order = _place_trials(counts, min_dist, max_iter, rng)
+    return [labels[i] for i in order]
+
+
+def make_sequences(n_subjects, conditions, n_trials, min_dist=0, max_iter=1000, n_jobs=1, seed=None):
+    """Make one sequence per subject and return them as a 2-D array of shape
+    (n_subjects, n_trials). All sequences are built and checked together as one array
+    and only the ones that failed are built again. The array is an integer array if
+    all conditions are integers, otherwise it is an object array of the conditions."""
+    if np is None:
+        raise ImportError("make_sequences requires numpy!")
     n_reps = int(n_trials / len(conditions))
-    trials = conditions * n_reps
-    random.shuffle(trials)
+    labels, counts = _count_conditions(conditions, n_reps)
+    if not is_feasible(counts, min_dist):
+        raise StopIteration(
+            f"No sequence of {sum(counts)} trials without repetitions within {min_dist} trials exists!"
+        )
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(n_jobs)
+    chunks = np.array_split(np.arange(n_subjects), n_jobs)
+    args = [(len(c), counts, min_dist, max_iter, s) for c, s in zip(chunks, seeds)]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(n_jobs) as pool:
+            sequences = np.vstack(list(pool.map(_make_rows, *zip(*args))))
+    else:
+        sequences = _make_rows(*args[0])
+    return _label_array(labels)[sequences]
+
+
+def _label_array(labels):
+    # np.asarray would turn mixed conditions like ["left", True] into strings and
+    # conditions like [1, "left"] into an extra dimension
+    if all(isinstance(label, (int, np.integer)) and not isinstance(label, bool) for label in labels):
+        return np.asarray(labels)
+    array = np.empty(len(labels), dtype=object)
+    for i, label in enumerate(labels):
+        array[i] = label
+    return array
+
+
+def _make_rows(n_rows, counts, min_dist, max_iter, seed):
+    rng = np.random.default_rng(seed)
+    sequences, failed = _place_rows(n_rows, counts, min_dist, rng)
+    bad = failed | _repeated_rows(sequences, min_dist)
     count = 0
-    while has_repetitions(trials, min_dist):
-        random.shuffle(trials)
+    while bad.any():
         count += 1
         if count >= max_iter:
-            raise StopIteration(f"Could not find a sequence after {count} iterations!")
-    return trials
+            raise StopIteration(f"Could not find {n_rows} sequences after {count} iterations!")
+        sequences[bad], failed = _place_rows(bad.sum(), counts, min_dist, rng)
+        bad[bad] = failed | _repeated_rows(sequences[bad], min_dist)
+    return sequences
+
+
+def _place_rows(n_rows, counts, min_dist, rng):
+    # same as _place_trials but for many sequences at once and without backtracking.
+    # Rows that run into a dead end are marked as failed
+    n, k = sum(counts), len(counts)
+    dist = min_dist + 1
+    rows = np.arange(n_rows)
+    left = np.tile(np.asarray(counts), (n_rows, 1))  # remaining trials per condition
+    last = np.full((n_rows, k), -dist)  # position where each condition was placed last
+    sequences = np.zeros((n_rows, n), dtype=np.intp)
+    failed = np.zeros(n_rows, dtype=bool)
+    for pos in range(n):
+        allowed = (left > 0) & (pos - last >= dist)
+        # can each condition still fit all of its trials if some other condition is placed at pos ...
+        first = np.maximum(pos + 1, last + dist)
+        other_fits = (left == 0) | (first + (left - 1) * dist <= n - 1)
+        # ... and if it is placed at pos itself?
+        self_fits = (left <= 1) | (pos + (left - 1) * dist <= n - 1)
+        n_misfits = (~other_fits).sum(axis=1, keepdims=True) - ~other_fits
+        weights = np.where(allowed & self_fits & (n_misfits == 0), left, 0)
+        total = weights.sum(axis=1)
+        failed |= total == 0
+        pick = rng.random(n_rows) * total
+        choice = np.minimum((np.cumsum(weights, axis=1) <= pick[:, np.newaxis]).sum(axis=1), k - 1)
+        sequences[:, pos] = choice
+        left[rows, choice] -= 1
+        last[rows, choice] = pos
+    return sequences, failed
+
+
+def is_feasible(counts, min_dist):
+    """Check if the given number of trials per condition can be arranged so that
+    no condition repeats within `min_dist` trials."""
+    counts = [c for c in counts if c > 0]
+    if not counts:
+        return True
+    n_max = max(counts)
+    n_at_max = counts.count(n_max)
+    return (n_max - 1) * (min_dist + 1) + n_at_max <= sum(counts)
+
+
+MAX_STATES = 5_000_000  # count_valid_sequences and sample_sequence give up above this many states per trial
+
+
+def count_valid_sequences(conditions, n_trials, min_dist=0):
+    """Count the sequences that make_sequence could return, i.e. all distinct orders
+    of the trials without repetitions within min_dist trials. Requires numpy. Raises
+    a ValueError if a position in the sequence has more than MAX_STATES possible states."""
+    n_reps = int(n_trials / len(conditions))
+    _, counts = _count_conditions(conditions, n_reps)
+    return _lookup(_count_completions(tuple(counts), min_dist), 0, _state(counts, [], min_dist))
+
+
+def sample_sequence(conditions, n_trials, min_dist=0, rng=None):
+    """Like make_sequence but every valid sequence is equally likely. This needs the
+    number of completions of every partial sequence (see count_valid_sequences), so
+    it is only practical for small to moderate numbers of trials and conditions
+    (e.g. 6 conditions with 120 trials and min_dist=2 takes a few seconds)."""
+    if rng is None:
+        rng = random
+    n_reps = int(n_trials / len(conditions))
+    labels, counts = _count_conditions(conditions, n_reps)
+    table = _count_completions(tuple(counts), min_dist)
+    if _lookup(table, 0, _state(counts, [], min_dist)) == 0:
+        raise StopIteration(
+            f"No sequence of {sum(counts)} trials without repetitions within {min_dist} trials exists!"
+        )
+    order = []
+    for pos in range(sum(counts)):
+        # pick the next condition with a probability proportional to its number of completions
+        options = []
+        for i, c in enumerate(counts):
+            if c > 0 and i not in order[max(0, len(order) - min_dist):]:
+                counts[i] -= 1
+                options.append((i, _lookup(table, pos + 1, _state(counts, order + [i], min_dist))))
+                counts[i] += 1
+        pick = rng.randrange(sum(n for _, n in options))
+        for i, n in options:
+            if pick < n:
+                break
+            pick -= n
+        counts[i] -= 1
+        order.append(i)
+    return [labels[i] for i in order]
+
+
+def _state(counts, order, min_dist):
+    # the number of completions only depends on the remaining trials of the last min_dist
+    # conditions (in order) and on the remaining trials of all others (in any order).
+    # A state is a row of min_dist blocked and len(counts) sorted free counts where -1
+    # stands for no trials left (or no condition yet, at the beginning of the sequence)
+    recent = order[max(0, len(order) - min_dist):] if min_dist > 0 else []
+    blocked = [-1] * (min_dist - len(recent)) + [counts[i] or -1 for i in recent]
+    free = sorted(c if c > 0 and i not in recent else -1 for i, c in enumerate(counts))
+    return blocked + free
+
+
+def _next_states(states, min_dist, j):
+    # the states after placing the condition in free column j of every state (rows).
+    # Returns them and which rows have trials left in that column
+    blocked, free = states[:, :min_dist], states[:, min_dist:]
+    left = free[:, j] - 1
+    left[left == 0] = -1
+    new_free = free.copy()
+    if min_dist > 0:  # the placed condition is blocked and the oldest blocked one is free again
+        new_free[:, j] = blocked[:, 0]
+        new = np.hstack([blocked[:, 1:], left[:, np.newaxis], np.sort(new_free, axis=1)])
+    else:
+        new_free[:, j] = left
+        new = np.sort(new_free, axis=1)
+    return new, free[:, j] > 0
+
+
+@lru_cache(maxsize=1)  # the tables can be large, so only the last one is kept
+def _count_completions(counts, min_dist):
+    """Return, for every position in the sequence, the sorted codes of the states that
+    can be reached there and their numbers of valid completions (as Python ints, because
+    they quickly exceed 64 bits). Computed level by level with one array row per state."""
+    if np is None:
+        raise ImportError("count_valid_sequences and sample_sequence require numpy!")
+    base = max(counts) + 2  # every entry of a state is between -1 and max(counts)
+    width = min_dist + len(counts)
+    if base ** width >= 2**63:
+        raise ValueError("Too many conditions or trials to count the valid sequences!")
+    powers = base ** np.arange(width, dtype=np.int64)
+    dtype = np.int8 if base <= 128 else np.int16 if base <= 2**15 else np.int64  # small rows sort faster
+    levels = [np.array([_state(list(counts), [], min_dist)], dtype=dtype)]
+    for pos in range(sum(counts)):
+        new = [states[valid] for states, valid in (_next_states(levels[-1], min_dist, j) for j in range(len(counts)))]
+        codes, index = np.unique((np.vstack(new) + 1) @ powers, return_index=True)
+        if len(codes) > MAX_STATES:
+            raise ValueError(f"More than {MAX_STATES} states after {pos + 1} trials, too many to count!")
+        levels.append(np.vstack(new)[index])
+    table = [None] * len(levels)
+    table[-1] = ((levels[-1] + 1) @ powers, np.ones(len(levels[-1]), dtype=object))
+    for pos in range(len(levels) - 2, -1, -1):
+        states = levels[pos]
+        next_codes, next_completions = table[pos + 1]
+        n_completions = np.zeros(len(states), dtype=object)
+        for j in range(len(counts)):
+            new, valid = _next_states(states, min_dist, j)
+            n_completions[valid] += next_completions[np.searchsorted(next_codes, (new[valid] + 1) @ powers)]
+        table[pos] = ((states + 1) @ powers, n_completions)
+        levels[pos + 1] = None  # no longer needed
+    return table, powers
+
+
+def _lookup(table, pos, state):
+    # number of completions of a state at the given position, 0 if it can't be reached
+    table, powers = table
+    codes, n_completions = table[pos]
+    code = int((np.asarray(state, dtype=np.int64) + 1) @ powers)
+    i = np.searchsorted(codes, code)
+    if i < len(codes) and codes[i] == code:
+        return int(n_completions[i])
+    return 0
+
+
+def _count_conditions(conditions, n_reps):
+    # conditions are compared with == (like in has_repetitions) so they don't need to be hashable
+    labels, counts = [], []
+    for c in conditions:
+        if c in labels:
+            counts[labels.index(c)] += n_reps
+        else:
+            labels.append(c)
+            counts.append(n_reps)
+    return labels, counts
+
+
+def _place_trials(counts, min_dist, max_iter, rng):
+    """Build the sequence trial by trial. At every position, pick one of the allowed
+    conditions at random (weighted by how many of its trials are left) and step
+    back only if no allowed condition is left. Returns a list of condition indices."""
+    counts = list(counts)
+    n = sum(counts)
+    dist = min_dist + 1  # smallest allowed distance between two equal conditions
+    last = [-dist] * len(counts)  # position where each condition was placed last
+    order, previous, options = [], [], []
+    n_backtracks = 0
+    while len(order) < n:
+        pos = len(order)
+        if len(options) == pos:
+            options.append(_options(counts, last, pos, n, dist, rng))
+        if options[pos]:
+            i = options[pos].pop()
+            previous.append(last[i])
+            last[i] = pos
+            counts[i] -= 1
+            order.append(i)
+        else:  # dead end, undo the last placement
+            n_backtracks += 1
+            if n_backtracks > max_iter:
+                raise StopIteration(f"Could not find a sequence after {n_backtracks} backtracking steps!")
+            options.pop()
+            i = order.pop()
+            counts[i] += 1
+            last[i] = previous.pop()
+    return order
+
+
+def _options(counts, last, pos, n, dist, rng):
+    # conditions that may be placed at pos, in random order (the last one is tried first)
+    options = []
+    for i, c in enumerate(counts):
+        if c > 0 and pos - last[i] >= dist and _fits(counts, last, pos, n, dist, i):
+            options.append((rng.random() ** (1 / c), i))
+    options.sort()
+    return [i for _, i in options]
+
+
+def _fits(counts, last, pos, n, dist, i):
+    # check that, after placing condition i at pos, every condition can still fit
+    # all of its remaining trials before the end of the sequence
+    for j, c in enumerate(counts):
+        if j == i:
+            c, first = c - 1, pos + dist
+        else:
+            first = max(pos + 1, last[j] + dist)
+        if c > 0 and first + (c - 1) * dist > n - 1:
+            return False
+    return True
 
 
 def has_repetitions(trials, min_dist=1):
-    trial_is_repeat = []
-    trial_is_repeat.append(
-        len(set(trials[:min_dist])) < len(trials[:min_dist])
-    )  # check beginning
-    for i in range(min_dist, len(trials)):  # check rest of list
-        this_trial_is_repeat = []
-        for j in range(1, min_dist + 1):
-            # print(f"i={i}, j={j}")
-            this_trial_is_repeat.append(trials[i] == trials[i - j])
-        trial_is_repeat.append(any(this_trial_is_repeat))
-    return any(trial_is_repeat)
-
-
-def save_sequence(trials, fname):
+    if min_dist < 1 or len(trials) < 2:
+        return False
+    if np is not None and isinstance(trials, np.ndarray):
+        # converting a list to an array costs more than checking it in Python, so only arrays use numpy
+        try:
+            codes = _encode(trials)
+        except TypeError:  # unhashable conditions in an object array
+            return _has_repetitions_python(trials, min_dist)
+        return bool(_repeated_rows(codes[np.newaxis, :], min_dist)[0])
+    return _has_repetitions_python(trials, min_dist)
+
+
+def _has_repetitions_python(trials, min_dist):
+    # a trial is a repetition if the same condition occurred within the last min_dist trials.
+    # This includes the beginning of the list because trials there are even closer together
+    last_seen = {}
+    try:
+        for i, t in enumerate(trials):
+            if t in last_seen and i - last_seen[t] <= min_dist:
+                return True
+            last_seen[t] = i
+    except TypeError:  # unhashable conditions like ["left", True] are compared with ==
+        return any(
+            trials[i] == trials[j] for i in range(len(trials)) for j in range(max(0, i - min_dist), i)
+        )
+    return False
+
+
+def _encode(trials):
+    # represent every condition by an integer code
+    if isinstance(trials, np.ndarray) and trials.ndim > 1:  # every row is one condition
+        return np.unique(trials, axis=0, return_inverse=True)[1].ravel()
+    if isinstance(trials, np.ndarray) and trials.dtype.kind in "iu":
+        return trials
+    codes = {}
+    return np.fromiter(
+        (codes.setdefault(t, len(codes)) for t in trials), dtype=np.intp, count=len(trials)
+    )
+
+
+def _repeated_rows(codes, min_dist):
+    # compare each row of a 2-D array of codes with itself shifted by 1 to min_dist trials
+    is_repeat = np.zeros(codes.shape[0], dtype=bool)
+    for shift in range(1, min(min_dist, codes.shape[1] - 1) + 1):
+        is_repeat |= (codes[:, shift:] == codes[:, :-shift]).any(axis=1)
+    return is_repeat
+
+
+MAGIC = b"SEQ\x01"  # first bytes of a binary sequence file
+BANK_RECORD = struct.Struct("<4sIII")  # header of every sequence in a bank: magic, subject, block, size
+_DTYPES = {"uint8": "B", "uint16": "H", "uint32": "I"}  # dtype names and their array typecodes
+
+
+def save_sequence(trials, fname, binary=False):
+    if binary:
+        with open(fname, 'wb') as f:
+            f.write(_pack_sequence(trials))
+        return
     with open(fname, 'w') as f:
         for i, t in enumerate(trials):
             if i < len(trials) - 1:
@@ -36,9 +371,110 @@ def save_sequence(trials, fname):
             else:
                 f.write(str(t))  # no newline for last element
 
+
 def load_sequence(fname):
+    with open(fname, 'rb') as f:
+        is_binary = f.read(len(MAGIC)) == MAGIC
+    if is_binary:
+        with open(fname, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _unpack_sequence(buffer)
     trials = []
     with open(fname, 'r') as f:
         for line in f:
-            trials.append(int(line.strip()))
-    return trials
\ No newline at end of file
+            trials.append(_parse_condition(line.strip()))
+    return trials
+
+
+def _parse_condition(text):
+    # numbers are read as int or float, everything else (e.g. "left") as a string
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def add_to_bank(trials, fname, subject, block=1):
+    """Append a sequence to a bank file (which is created if it does not exist).
+    Adding a subject and block that is already in the bank replaces its sequence."""
+    payload = _pack_sequence(trials)
+    if os.path.exists(fname):
+        bank_index(fname)
+        end = _bank_indices[os.path.abspath(fname)][1]  # end of the last complete record
+        if end < os.path.getsize(fname):  # drop an incomplete record so the new one can be found
+            os.truncate(fname, end)
+    with open(fname, 'ab') as f:
+        f.write(BANK_RECORD.pack(MAGIC, subject, block, len(payload)) + payload)
+
+
+def load_from_bank(fname, subject, block=1):
+    offset = bank_index(fname)[(subject, block)]
+    with open(fname, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return _unpack_sequence(buffer, offset)
+
+
+_bank_indices = {}  # bank file -> (inode, bytes indexed so far, index)
+
+
+def bank_index(fname):
+    """Return a dictionary that maps (subject, block) to the position of that sequence in
+    the bank. The index is kept in memory and only the records that were appended since
+    the last call are read. An incomplete last record (e.g. from a crash while adding it)
+    is left out of the index."""
+    stat = os.stat(fname)
+    key = os.path.abspath(fname)
+    inode, pos, index = _bank_indices.get(key, (None, 0, {}))
+    if inode != stat.st_ino or pos > stat.st_size:  # a different file, start over
+        pos, index = 0, {}
+    with open(fname, 'rb') as f:
+        while pos + BANK_RECORD.size <= stat.st_size:
+            f.seek(pos)
+            magic, subject, block, size = BANK_RECORD.unpack(f.read(BANK_RECORD.size))
+            if magic != MAGIC:
+                raise ValueError(f"{fname} is not a sequence bank (bad record at byte {pos})!")
+            if pos + BANK_RECORD.size + size > stat.st_size:  # the sequence was not written completely
+                break
+            index[(subject, block)] = pos + BANK_RECORD.size
+            pos += BANK_RECORD.size + size
+    _bank_indices[key] = (stat.st_ino, pos, index)
+    return index
+
+
+def _pack_sequence(trials):
+    """Binary format: MAGIC, the header's length as uint32, a JSON header with the
+    dtype, length and condition labels and finally every trial's index into the labels."""
+    if np is not None and isinstance(trials, np.ndarray):
+        trials = trials.tolist()
+    index = {}
+    labels, codes = [], []
+    for t in trials:
+        if np is not None and isinstance(t, np.generic):  # e.g. the rows of make_sequences
+            t = t.item()
+        try:
+            code = index.setdefault((type(t), t), len(labels))
+        except TypeError:  # unhashable conditions like ["left", True]
+            code = index.setdefault(json.dumps(t), len(labels))
+        if code == len(labels):
+            labels.append(t)
+        codes.append(code)
+    dtype = next(d for d, c in _DTYPES.items() if len(labels) <= 256 ** array(c).itemsize)
+    header = json.dumps({"dtype": dtype, "length": len(codes), "labels": labels}).encode()
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)  # pad so the array is aligned
+    codes = array(_DTYPES[dtype], codes)
+    if sys.byteorder == "big":
+        codes.byteswap()  # files are always little endian
+    return MAGIC + struct.pack("<I", len(header)) + header + codes.tobytes()
+
+
+def _unpack_sequence(buffer, offset=0):
+    header_len, = struct.unpack_from("<I", buffer, offset + len(MAGIC))
+    start = offset + len(MAGIC) + 4 + header_len
+    header = json.loads(bytes(buffer[start - header_len:start]))
+    typecode, labels = _DTYPES[header["dtype"]], header["labels"]
+    stop = start + header["length"] * array(typecode).itemsize
+    with memoryview(buffer)[start:stop] as view, view.cast(typecode) as codes:
+        if sys.byteorder == "big":
+            codes = array(typecode, codes.tobytes())
+            codes.byteswap()
+        return [labels[c] for c in codes]
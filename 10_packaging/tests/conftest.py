@@ -7,6 +7,23 @@ from psychopy import visual
 from posner.experiment import create_subject_dir, Config
 
 
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", help="run the benchmarks in test_benchmark.py")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing test that only runs with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip)
+
+
 @pytest.fixture
 def config_dict():
     return {
@@ -72,5 +89,6 @@ def mock_text():
 @pytest.fixture
 def mock_waitKeys():
     with mock.patch("posner.experiment.event.waitKeys") as mock_waitKeys:
-        mock_waitKeys.side_effect = lambda keyList: [random.choice(keyList)]
+        rng = random.Random(0)  # the same simulated responses in every run
+        mock_waitKeys.side_effect = lambda keyList: [rng.choice(keyList)]
         yield mock_waitKeys
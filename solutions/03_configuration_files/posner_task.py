@@ -1,14 +1,22 @@
 import json
-from random import shuffle
-from psychopy.core import Clock, wait
+import random
+import time
+from psychopy.core import Clock
 from psychopy.visual import Window, Rect, Circle, TextStim
 from psychopy.event import waitKeys
+from trial_log import TrialLog, compact
 
 #### Define parameters ####
 N_TRIALS = 10  # number of trials
+SEED = None  # seed for the random number generator, set it to an integer to get the same trial order every time
 P_VALID = 0.8  # probability that a cue is valid
 FIX_DUR = 0.5  # duration for which fixation is displayed
 CUE_DUR = 0.5  # duration for which cue is displayed
+REUSE_STIMULI = True  # create the stimuli once instead of before every part of every trial
+TIMING_SUMMARY = False  # print the number of dropped frames and timing errors at the end
+SESSION = time.strftime("%Y%m%d-%H%M%S")  # every run gets its own log and results file
+LOG_FILE = "posner_task_log_" + SESSION + ".jsonl"  # every trial is appended here while the experiment runs
+RESULTS_FILE = "posner_task_results_" + SESSION + ".csv"  # the log is converted to this file at the end
 INSTRUCTIONS = """
     Welcome! \n
     When the experiment starts, you'll see a white dot and two white boxes. \n
@@ -31,15 +39,52 @@ for s in ["left", "right"]:
     n_valid = int(n * P_VALID)
     valid += [True] * n_valid + [False] * (n - n_valid)  # whether the cue is valid (True or False)
 
+rng = random.Random(SEED)
 idx = list(range(N_TRIALS))
-shuffle(idx)  # randomize the order
+rng.shuffle(idx)  # randomize the order
 trials = []
 for i in idx:
     trials.append([side[i], valid[i]])  # list of trials where each element is a list of 2, e.g. ["left", True]
 
+#### Define the stimuli ####
+def make_boxes(win):
+    box_left = Rect(win, lineColor="white", pos=(-0.5, 0))
+    box_right = Rect(win, lineColor="white", pos=(0.5, 0))
+    return box_left, box_right
+
+def make_fixation(win):
+    return Circle(win, fillColor="white", radius=0.05)
+
+def make_stim(win):
+    return Circle(win, fillColor="red", pos=(-0.5, 0), radius=0.05)
+
+def make_stimuli(win):
+    box_left, box_right = make_boxes(win)
+    return box_left, box_right, make_fixation(win), make_stim(win)
+
+def show(win, stimuli, n_frames):
+    # draw the stimuli on every frame instead of sleeping so the duration is
+    # locked to the screen refresh. Returns the time of every flip
+    flip_times = []
+    for _ in range(n_frames):
+        for s in stimuli:
+            s.draw()
+        flip_times.append(win.flip())
+    return flip_times
+
 #### Run the Experiment ####
 clock = Clock()
-with Window() as win:
+with Window() as win, TrialLog(LOG_FILE) as log:
+    # creating stimuli allocates graphics resources, so we create them once
+    # and only change their color and position before drawing
+    box_left, box_right, fixation, stim = make_stimuli(win)
+
+    # convert durations to a number of frames
+    frame_rate = win.getActualFrameRate()
+    if frame_rate is None:  # frame rate could not be measured
+        frame_rate = 60
+    n_fix_frames = max(1, round(FIX_DUR * frame_rate))
+    n_cue_frames = max(1, round(CUE_DUR * frame_rate))
 
     #### Show instructions ####
     text = TextStim(win, text=INSTRUCTIONS, height=0.07)
@@ -48,40 +93,37 @@ with Window() as win:
     waitKeys(keyList=["space"])
 
     #### Run trials ####
+    results = []  # one dictionary with responses and timestamps per trial
     count = 0
     for t in trials:
         count+=1
 
         # show boxes and fixation
-        box_left = Rect(win, lineColor="white", pos=(-0.5, 0))
-        box_right = Rect(win, lineColor="white", pos=(0.5, 0))
-        fixation = Circle(win, fillColor="white", radius=0.05)
-        _, _, _ = box_left.draw(), box_right.draw(), fixation.draw()
-        win.flip()
-
-        wait(FIX_DUR)
+        if not REUSE_STIMULI:  # like before, new stimuli for every part of the trial
+            box_left, box_right = make_boxes(win)
+            fixation = make_fixation(win)
+        box_left.lineColor, box_right.lineColor = "white", "white"
+        fix_flips = show(win, [box_left, box_right, fixation], n_fix_frames)
 
+        if not REUSE_STIMULI:
+            box_left, box_right = make_boxes(win)
         # if stim is on the left and cue is valid OR if stim is on the right and cue is invalid
         if ( t[0] == "left" and t[1] == True) or ( t[0] == "right" and t[1] == False):
-            box_left = Rect(win, lineColor="red", pos=(-0.5, 0)) # highlight the left box
-            box_right = Rect(win, lineColor="white", pos=(0.5, 0))
+            box_left.lineColor = "red" # highlight the left box
         else:
-            box_left = Rect(win, lineColor="white", pos=(-0.5, 0))
-            box_right = Rect(win, lineColor="red", pos=(0.5, 0)) # highlight the right box
-        _, _, _ = box_left.draw(), box_right.draw(), fixation.draw()
-        win.flip()
-
-        wait(CUE_DUR)
+            box_right.lineColor = "red" # highlight the right box
+        cue_flips = show(win, [box_left, box_right, fixation], n_cue_frames)
 
         # show stimulus
-        box_left = Rect(win, lineColor="white", pos=(-0.5, 0))
-        box_right = Rect(win, lineColor="white", pos=(0.5, 0))
+        if not REUSE_STIMULI:
+            box_left, box_right = make_boxes(win)
+            stim = make_stim(win)
+        box_left.lineColor, box_right.lineColor = "white", "white"
         if t[0] == "left":
-            stim = Circle(win, fillColor="red", pos=(-0.5, 0), radius=0.05)
+            stim.pos = (-0.5, 0)
         else:
-            stim = Circle(win, fillColor="red", pos=(0.5, 0), radius=0.05)
-        _, _, _ = box_left.draw(), box_right.draw(), stim.draw()
-        win.flip()
+            stim.pos = (0.5, 0)
+        stim_flips = show(win, [box_left, box_right, stim], 1)
 
         #### Obtain Response ####
         clock.reset() 
@@ -94,4 +136,35 @@ with Window() as win:
             response = "correct"
         else:
             response = "wrong"
-        print("Trial " + str(count) + ": " + response + " response with rt=" + str(rt))
\ No newline at end of file
+        flips = fix_flips + cue_flips + stim_flips
+        results.append({
+            "side": t[0],
+            "valid": t[1],
+            "response": name,
+            "response_time": rt,
+            "fixation_onset": fix_flips[0],
+            "cue_onset": cue_flips[0],
+            "stim_onset": stim_flips[0],
+            "keypress": stim_flips[0] + keys[0][1],  # clock is reset right after the stimulus onset
+            "flip_intervals": [b - a for a, b in zip(flips[:-1], flips[1:])],
+        })
+        log.append(results[-1])
+        fix_dur = round(cue_flips[0] - fix_flips[0], 4) # measured durations
+        cue_dur = round(stim_flips[0] - cue_flips[0], 4)
+        print("Trial " + str(count) + ": " + response + " response with rt=" + str(rt)
+              + " (fixation: " + str(fix_dur) + " s, cue: " + str(cue_dur) + " s)")
+
+compact(LOG_FILE, RESULTS_FILE)
+
+#### Summarize timing ####
+if TIMING_SUMMARY:
+    frame_dur = 1 / frame_rate
+    n_dropped = 0
+    fix_errors, cue_errors = [], []
+    for r in results:
+        n_dropped += sum(i > 1.5 * frame_dur for i in r["flip_intervals"])
+        fix_errors.append(abs(r["cue_onset"] - r["fixation_onset"] - n_fix_frames * frame_dur))
+        cue_errors.append(abs(r["stim_onset"] - r["cue_onset"] - n_cue_frames * frame_dur))
+    print("Dropped frames: " + str(n_dropped))
+    print("Mean fixation timing error: " + str(round(sum(fix_errors) / len(fix_errors), 4)) + " s")
+    print("Mean cue timing error: " + str(round(sum(cue_errors) / len(cue_errors), 4)) + " s")
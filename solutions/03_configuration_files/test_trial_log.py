@@ -0,0 +1,67 @@
+import csv
+import json
+import pytest
+from trial_log import TrialLog, compact
+
+def test_trial_log_writes_rows(tmp_path):
+    fname = tmp_path / "log" / "trials.jsonl"  # the directory is created by the log
+    rows = [{"trial": i, "rt": 0.1 * i} for i in range(100)]
+    with TrialLog(fname) as log:
+        for row in rows:
+            log.append(row)
+    assert [json.loads(line) for line in fname.read_text().splitlines()] == rows
+
+def test_trial_log_appends_to_existing_log(tmp_path):
+    fname = tmp_path / "trials.jsonl"
+    with TrialLog(fname) as log:
+        log.append({"trial": 1})
+    with TrialLog(fname) as log:
+        log.append({"trial": 2})
+    assert fname.read_text().splitlines() == ['{"trial": 1}', '{"trial": 2}']
+
+def test_compact(tmp_path):
+    log_fname, out_fname = tmp_path / "trials.jsonl", tmp_path / "trials.csv"
+    rows = [{"side": "left", "valid": True, "rt": 0.25}, {"side": "right", "valid": False, "rt": 0.5}]
+    with TrialLog(log_fname) as log:
+        for row in rows:
+            log.append(row)
+    assert compact(log_fname, out_fname) == rows
+    with open(out_fname, newline="") as f:
+        assert list(csv.DictReader(f)) == [
+            {"side": "left", "valid": "True", "rt": "0.25"}, {"side": "right", "valid": "False", "rt": "0.5"}
+        ]
+
+def test_compact_empty_log(tmp_path):
+    log_fname, out_fname = tmp_path / "trials.jsonl", tmp_path / "trials.csv"
+    log_fname.write_text("")
+    assert compact(log_fname, out_fname) == []
+    assert out_fname.read_text() == ""
+
+def test_compact_after_crash_and_rerun(tmp_path):
+    # the first session crashed while writing its second trial, then a second session appended to the same log
+    log_fname, out_fname = tmp_path / "trials.jsonl", tmp_path / "trials.csv"
+    log_fname.write_text('{"session": 1, "trial": 1}\n{"session": 1, "tri')
+    with TrialLog(log_fname) as log:
+        log.append({"session": 2, "trial": 1})
+        log.append({"session": 2, "trial": 2})
+    rows = compact(log_fname, out_fname)
+    assert rows == [{"session": 1, "trial": 1}, {"session": 2, "trial": 1}, {"session": 2, "trial": 2}]
+
+def test_compact_skips_broken_lines(tmp_path):
+    log_fname, out_fname = tmp_path / "trials.jsonl", tmp_path / "trials.csv"
+    log_fname.write_text('{"trial": 1}\n{"tri\n{"trial": 3}\n{"trial": 4')
+    assert compact(log_fname, out_fname) == [{"trial": 1}, {"trial": 3}]
+
+def test_trial_log_raises_writer_error_on_close(tmp_path):
+    log = TrialLog(tmp_path / "trials.jsonl")
+    log.append({"stimulus": object()})  # can't be written as JSON
+    with pytest.raises(RuntimeError, match="trials.jsonl"):
+        log.close()
+
+def test_trial_log_raises_writer_error_on_append(tmp_path):
+    (tmp_path / "data").write_text("")  # a file where the log's directory should be
+    log = TrialLog(tmp_path / "data" / "trials.jsonl")
+    log.thread.join()  # the thread fails when it tries to create the directory
+    with pytest.raises(RuntimeError) as error:
+        log.append({"trial": 1})
+    assert isinstance(error.value.__cause__, OSError)
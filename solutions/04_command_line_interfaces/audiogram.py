@@ -0,0 +1,79 @@
+"""Measure the detection thresholds for several frequencies and both ears.
+Every frequency and ear has its own staircase and on every trial one of the
+unfinished staircases is picked at random, so fatigue affects all of them alike.
+Example: python audiogram.py --freqs 500 1000 2000 4000 --ears left --out thresholds.csv"""
+import csv
+import random
+from argparse import ArgumentParser
+import numpy as np
+from psychopy.sound import Sound
+from psychopy.visual import Window, TextStim
+from psychopy.event import waitKeys
+from tones import pure_tones, SAMPLE_RATE
+from staircase import Staircase
+from psi import Psi
+
+CHANNELS = {"left": 0, "right": 1}
+
+parser = ArgumentParser()
+parser.add_argument("--freqs", type=int, nargs="+", default=[250, 500, 1000, 2000, 4000, 8000])
+parser.add_argument("--ears", nargs="+", choices=list(CHANNELS), default=list(CHANNELS))
+parser.add_argument("--method", choices=["staircase", "psi"], default="staircase")
+parser.add_argument("--secs", type=float, default=0.25)
+parser.add_argument("--n-reversals", type=int, default=5)
+parser.add_argument("--n-trials", type=int, default=30, help="trials per track with --method psi")
+parser.add_argument("--seed", type=int, default=None)
+parser.add_argument("--out", type=str, default=None, help="write the threshold table to this CSV file")
+args = parser.parse_args()
+
+KEY_YES = "y"
+KEY_NO = "n"
+START_VOLUME = 0.8
+STEP_SIZE = 0.1
+
+instructions = "Press " + KEY_YES + " if you heard the tone and " + KEY_NO + " if you didn't!"
+rng = random.Random(args.seed)
+# synthesize all frequencies at once, then put each tone into the channel of one ear
+samples = pure_tones(args.freqs, args.secs)
+with Window() as win:
+
+    text = TextStim(win, text=instructions)
+    text.draw()
+    win.flip()
+
+    # create every tone before the first trial, so there is no synthesis between trials
+    tones, tracks = {}, {}
+    for freq, tone in zip(args.freqs, samples):
+        for ear in args.ears:
+            stereo = np.zeros((len(tone), 2), dtype=np.float32)
+            stereo[:, CHANNELS[ear]] = tone
+            tones[freq, ear] = Sound(value=stereo, sampleRate=SAMPLE_RATE, hamming=False, stereo=True)
+            if args.method == "psi":
+                tracks[freq, ear] = Psi(n_trials=args.n_trials)
+            else:
+                tracks[freq, ear] = Staircase(START_VOLUME, STEP_SIZE, args.n_reversals, min_level=0, max_level=1)
+
+    # every track stops on its own, the run is over when all of them are finished
+    running = list(tracks)
+    while running:
+        track = rng.choice(running)
+        tones[track].setVolume(tracks[track].level)
+        tones[track].play()
+        keys = waitKeys(keyList=[KEY_NO, KEY_YES])
+        tracks[track].update(heard=keys[0] == KEY_YES)
+        if tracks[track].finished:
+            running.remove(track)
+
+rows = [
+    {"frequency": freq, "ear": ear, "threshold": round(tracks[freq, ear].threshold(), 3),
+     "n_trials": len(tracks[freq, ear].history)}
+    for freq in args.freqs for ear in args.ears
+]
+print("frequency  " + "  ".join(f"{ear:>6}" for ear in args.ears))
+for freq in args.freqs:
+    print(f"{freq:>9}  " + "  ".join(f"{tracks[freq, ear].threshold():6.3f}" for ear in args.ears))
+if args.out is not None:
+    with open(args.out, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
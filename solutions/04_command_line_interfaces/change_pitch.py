@@ -1,10 +1,12 @@
 from argparse import ArgumentParser
+from functools import lru_cache
 from psychopy import prefs
 
 prefs.hardware["audioLatencyMode"] = 0
 from psychopy.event import waitKeys
 from psychopy.sound import Sound
 from psychopy.visual import Window
+from tones import pure_tones, SAMPLE_RATE
 
 parser = ArgumentParser()
 parser.add_argument("freq", type=int)
@@ -12,10 +14,18 @@ parser.add_argument("step", type=int)
 parser.add_argument("n_trials", type=int)
 args = parser.parse_args()
 
+# every frequency that can be reached within n_trials steps, synthesized at once
+freqs = [args.freq + i * args.step for i in range(-args.n_trials, args.n_trials + 1)]
+samples = dict(zip(freqs, pure_tones(freqs, 0.5)))
+
+@lru_cache(maxsize=64)  # create each tone once, not every time its frequency comes up again
+def get_tone(freq):
+    return Sound(value=samples[freq], sampleRate=SAMPLE_RATE, hamming=False, stereo=False)
+
 freq = args.freq
 with Window() as win:
     for i in range(args.n_trials):
-        tone = Sound(value=freq, stereo=False)
+        tone = get_tone(freq)
         tone.play()
         key = waitKeys(keyList=["up", "down"])[0]
         if key == "up":
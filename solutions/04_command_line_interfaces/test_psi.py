@@ -0,0 +1,40 @@
+import math
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+from psi import Psi
+
+def listener(threshold, slope, seed):
+    # simulated observer whose responses follow the same psychometric function as Psi's
+    rng = random.Random(seed)
+    return lambda level: rng.random() < 0.02 + 0.96 / (1 + math.exp(-slope * (level - threshold)))
+
+def run(psi, respond):
+    while not psi.finished:
+        psi.update(respond(psi.level))
+    return psi
+
+@pytest.mark.parametrize("threshold", [0.2, 0.5, 0.7])
+def test_psi_converges(threshold):
+    errors = [run(Psi(n_trials=40), listener(threshold, 40, seed)).threshold() - threshold for seed in range(10)]
+    assert math.sqrt(sum(e ** 2 for e in errors) / len(errors)) < 0.05
+
+def test_psi_picks_levels_from_the_grid():
+    psi = run(Psi(n_trials=10), listener(0.4, 40, 0))
+    assert all(level in psi.levels for level, _ in psi.history)
+    assert len(psi.history) == 10
+
+def test_psi_stops_early():
+    psi = run(Psi(n_trials=200, sd_stop=0.03), listener(0.4, 40, 0))
+    assert len(psi.history) < 200
+    assert psi.threshold_sd() < 0.03
+
+def test_psi_save_and_load(tmp_path):
+    psi = run(Psi(n_trials=15), listener(0.4, 40, 1))
+    fname = tmp_path / "psi.json"
+    psi.save(fname)
+    loaded = Psi.load(fname)
+    assert loaded.history == psi.history
+    assert loaded.threshold() == pytest.approx(psi.threshold())
+    assert loaded.level == psi.level
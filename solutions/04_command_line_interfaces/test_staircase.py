@@ -0,0 +1,67 @@
+import pytest
+from staircase import Staircase
+
+def run(staircase, responses):
+    for heard in responses:
+        staircase.update(heard)
+    return staircase
+
+def test_one_up_one_down():
+    staircase = run(Staircase(0.5, 0.1), [True, True, False, True, False])
+    assert [round(level, 2) for level, _ in staircase.history] == [0.5, 0.4, 0.3, 0.4, 0.3]
+    assert [round(r, 2) for r in staircase.reversals] == [0.3, 0.4, 0.3]
+    assert round(staircase.level, 2) == 0.4
+
+def test_finished_after_n_reversals():
+    staircase = Staircase(0.5, 0.1, n_reversals=3)
+    responses = iter([True, False] * 10)
+    while not staircase.finished:
+        staircase.update(next(responses))
+    assert len(staircase.reversals) == 3
+    assert staircase.threshold() == pytest.approx(sum(staircase.reversals) / 3)
+    assert staircase.threshold(n_skip=1) == pytest.approx(sum(staircase.reversals[1:]) / 2)
+
+def test_threshold_without_reversals():
+    with pytest.raises(ValueError):
+        Staircase(0.5, 0.1).threshold()
+
+def test_two_down_one_up():
+    staircase = run(Staircase(0.5, 0.1, n_down=2), [True, True, True, False])
+    assert [round(level, 2) for level, _ in staircase.history] == [0.5, 0.5, 0.4, 0.4]
+    assert round(staircase.level, 2) == 0.5  # a single "no" is enough to go up
+    assert staircase.reversals == [pytest.approx(0.4)]
+
+def test_one_down_two_up():
+    staircase = run(Staircase(0.5, 0.1, n_up=2), [False, False])
+    assert round(staircase.level, 2) == 0.6
+
+def test_weighted_steps():
+    staircase = Staircase.weighted(0.5, 0.1, target=0.75)
+    assert staircase.params["up_ratio"] == pytest.approx(3)
+    run(staircase, [False])
+    assert staircase.level == pytest.approx(0.8)
+    run(staircase, [True])
+    assert staircase.level == pytest.approx(0.7)
+
+def test_step_shrinks_after_reversals():
+    staircase = run(Staircase(0.5, 0.2, shrink=0.5, min_step=0.04), [False, True, False, True])
+    # every response is a reversal: the step goes 0.1, 0.05 and is then limited by min_step
+    assert [round(level, 3) for level, _ in staircase.history] == [0.5, 0.6, 0.55, 0.59]
+    assert staircase.step == pytest.approx(0.04)
+
+def test_level_is_clamped():
+    staircase = run(Staircase(0.1, 0.3, min_level=0, max_level=1), [True])
+    assert staircase.level == 0
+    run(staircase, [False] * 5)
+    assert staircase.level == 1
+
+def test_save_and_load(tmp_path):
+    staircase = run(Staircase(0.5, 0.1, n_down=2, shrink=0.8), [True, True, False, True])
+    fname = tmp_path / "staircase.json"
+    staircase.save(fname)
+    loaded = Staircase.load(fname)
+    assert loaded.to_dict() == staircase.to_dict()
+    assert loaded.history == staircase.history
+    for s in (staircase, loaded):
+        run(s, [True, False, False])
+    assert loaded.to_dict() == staircase.to_dict()
@@ -0,0 +1,34 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+from tones import pure_tones, tone_complex, apply_ramp, SAMPLE_RATE
+
+def test_pure_tones_shape():
+    assert pure_tones(440, 0.5).shape == (int(0.5 * SAMPLE_RATE),)
+    assert pure_tones([440, 880, 1000], 0.5).shape == (3, int(0.5 * SAMPLE_RATE))
+    assert pure_tones(440, 0.5).dtype == np.float32
+
+def test_pure_tones_are_ramped():
+    tone = pure_tones(440, 0.5)
+    assert tone[0] == 0 and tone[-1] == 0
+    assert np.abs(tone).max() <= 1
+
+@pytest.mark.parametrize("frequencies,amplitudes", [
+    (440, None),
+    (440, [0.5]),
+    (440, 0.5),
+    ([440, 880], [1, 0.5]),
+    ([440, 880], 0.5),
+])
+def test_tone_complex_shape(frequencies, amplitudes):
+    sound = tone_complex(frequencies, 0.1, amplitudes)
+    assert sound.shape == (int(0.1 * SAMPLE_RATE),)
+    assert np.abs(sound).max() <= 1
+
+def test_tone_complex_of_one_frequency():
+    assert np.allclose(tone_complex(440, 0.1), pure_tones(440, 0.1))
+
+def test_apply_ramp():
+    sound = apply_ramp(np.ones((2, 1000)))
+    assert sound.shape == (2, 1000)
+    assert (sound[:, 0] == 0).all() and (sound[:, 500] == 1).all()
@@ -1,10 +1,77 @@
+from collections import OrderedDict
+import numpy as np
+from psychopy.constants import PLAYING
 from psychopy.sound import Sound
+from tones import pure_tones, RAMP_DUR
+
+
+class ToneCache:
+    """Keep the tones that were created before, so that a tone with the same
+    frequency, duration, volume, sample rate, channels and ramp is only synthesized
+    once. Every tone has a small pool of preallocated Sound objects: get() hands out
+    one that is not playing, so a tone can overlap with itself up to max_handles
+    times before the oldest handle is stopped and reused. The least recently used
+    tones are dropped when the buffers of all handles take up more than max_bytes."""
+
+    def __init__(self, max_bytes=64 * 2**20, max_handles=4):
+        self.max_bytes = max_bytes
+        self.max_handles = max_handles
+        self.n_bytes = 0
+        self.tones = OrderedDict()  # key -> (samples, handles)
+
+    def get(self, frequency, duration, volume=1.0, sample_rate=44100, stereo=False, hamming=True):
+        key = (frequency, duration, volume, sample_rate, stereo, hamming)
+        if key in self.tones:
+            self.tones.move_to_end(key)  # mark as most recently used
+            samples, handles = self.tones[key]
+        else:
+            samples = pure_tones(frequency, duration, sample_rate, RAMP_DUR if hamming else 0)
+            if stereo:
+                samples = np.column_stack([samples, samples])
+            samples, handles = self.tones.setdefault(key, (samples, []))
+        for tone in handles:
+            if tone.status != PLAYING:
+                break
+        else:  # every handle is playing
+            if len(handles) < self.max_handles:
+                tone = self._make_sound(samples, key)
+                handles.append(tone)
+                self.n_bytes += samples.nbytes  # every Sound keeps its own copy of the samples
+                self._shrink()
+            else:
+                tone = handles.pop(0)  # the handle that was started first
+                tone.stop()
+                handles.append(tone)
+        tone.setVolume(volume)  # undo changes from the last time this handle was used
+        return tone
+
+    def _shrink(self):
+        while self.n_bytes > self.max_bytes and len(self.tones) > 1:
+            _, (samples, handles) = self.tones.popitem(last=False)
+            self.n_bytes -= samples.nbytes * len(handles)
+
+    @staticmethod
+    def _make_sound(samples, key):
+        frequency, duration, volume, sample_rate, stereo, _ = key
+        # the samples already have their ramps, so psychopy must not add another one
+        tone = Sound(value=samples, volume=volume, sampleRate=sample_rate, stereo=stereo, hamming=False)
+        # keep the attributes that Sound(value=frequency, secs=duration) would have
+        tone.sound, tone.secs = frequency, duration
+        return tone
+
+    def clear(self):
+        self.tones.clear()
+        self.n_bytes = 0
+
+
+tone_cache = ToneCache()
+
 
 def make_tone(frequency=300, duration=0.3):
-    return Sound(value=frequency, secs=duration)
+    return tone_cache.get(frequency, duration)
 
 def make_and_play_tone(frequency=300, duration=0.3, play=False):
-    tone = Sound(value=frequency, secs=duration)
+    tone = tone_cache.get(frequency, duration)
     if play:
         tone.play()
-    return tone
\ No newline at end of file
+    return tone
@@ -1,5 +1,7 @@
-from sequencegen import has_repetitions, make_sequence, save_sequence, load_sequence
+from sequencegen import has_repetitions, make_sequence, save_sequence, load_sequence, is_feasible, make_sequences, add_to_bank, load_from_bank, count_valid_sequences, sample_sequence
+import random
 import pytest
+import sequencegen
 
 def test_has_repetitions():
     assert has_repetitions([1,2]) == False
@@ -9,6 +11,31 @@ def test_has_repetitions_respects_min_dist():
     assert has_repetitions([1,2,3,1], 2) == False
     assert has_repetitions([1,2,3,1], 3) == True
 
+def test_has_repetitions_without_numpy(monkeypatch):
+    monkeypatch.setattr(sequencegen, "np", None)
+    assert has_repetitions([1,2]) == False
+    assert has_repetitions([1,1]) == True
+    assert has_repetitions([1,2,3,1], 2) == False
+    assert has_repetitions([1,2,3,1], 3) == True
+    assert has_repetitions([1,1,2,3], 5) == True  # repetition at the beginning
+
+def test_has_repetitions_unhashable_conditions():
+    assert has_repetitions([[1,"l"],[2,"r"],[1,"l"]], 1) == False
+    assert has_repetitions([[1,"l"],[2,"r"],[1,"l"]], 2) == True
+
+@pytest.mark.parametrize("min_dist", range(5))
+def test_has_repetitions_backends_agree(min_dist):
+    np = pytest.importorskip("numpy")
+    rng = random.Random(min_dist)
+    for _ in range(200):
+        trials = [rng.choice(["a", "b", "c", "d"]) for _ in range(rng.randint(0, 20))]
+        assert has_repetitions(np.array(trials), min_dist) == sequencegen._has_repetitions_python(trials, min_dist)
+
+def test_has_repetitions_array_rows():
+    np = pytest.importorskip("numpy")
+    assert has_repetitions(np.array([[1,2],[3,4],[1,2]]), 1) == False
+    assert has_repetitions(np.array([[1,2],[3,4],[1,2]]), 2) == True
+
 @pytest.mark.parametrize("n_trials", range(1, 1000))
 def test_sequence_has_correct_len(n_trials):
     assert len(make_sequence([1], n_trials)) == n_trials
@@ -22,9 +49,163 @@ def test_max_iteration(conditions, max_iter):
     with pytest.raises(StopIteration):
         make_sequence(conditions, 10, max_iter)
 
+@pytest.mark.parametrize("conditions,n_trials,min_dist", [
+    ([1,2,3,4], 2000, 3),
+    ([1,2,3,4,5], 2000, 3),
+    (["left","right"], 2000, 1),
+])
+def test_long_sequence_has_no_repetitions(conditions, n_trials, min_dist):
+    trials = make_sequence(conditions, n_trials, min_dist)
+    assert len(trials) == n_trials
+    assert not has_repetitions(trials, min_dist)
+    for c in conditions:
+        assert trials.count(c) == n_trials / len(conditions)
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_make_sequences(n_jobs):
+    pytest.importorskip("numpy")
+    sequences = make_sequences(50, [1,2,3,4], 100, 3, n_jobs=n_jobs, seed=1)
+    assert sequences.shape == (50, 100)
+    for trials in sequences:
+        assert not has_repetitions(list(trials), 3)
+        assert list(trials).count(1) == 25
+
+@pytest.mark.parametrize("conditions", [
+    ["left", "right", True],
+    [[1,"left"], [2,"right"], [1,"right"]],
+])
+def test_make_sequences_keeps_conditions(conditions):
+    pytest.importorskip("numpy")
+    sequences = make_sequences(5, conditions, 30, 1, seed=1)
+    assert sequences.shape == (5, 30)
+    for trials in sequences:
+        assert sorted(map(str, trials)) == sorted(map(str, conditions * 10))
+        assert all(any(t is c for c in conditions) for t in trials)
+
+def test_make_sequence_is_reproducible():
+    assert make_sequence([1,2,3], 30, 1, rng=random.Random(5)) == make_sequence([1,2,3], 30, 1, rng=random.Random(5))
+    assert make_sequence([1,2,3], 30, rng=random.Random(5)) == make_sequence([1,2,3], 30, rng=random.Random(5))
+
+def test_make_sequences_is_reproducible():
+    pytest.importorskip("numpy")
+    assert (make_sequences(10, [1,2,3], 30, 1, seed=5) == make_sequences(10, [1,2,3], 30, 1, seed=5)).all()
+
+@pytest.mark.parametrize("conditions,n_trials,min_dist,n_sequences", [
+    ([1,2], 4, 1, 2),  # 1212 and 2121
+    ([1,2,3], 3, 2, 6),  # every order of 3 different conditions
+    ([1,2,3], 6, 1, 30),
+    ([1,2,3], 6, 3, 0),
+])
+def test_count_valid_sequences(conditions, n_trials, min_dist, n_sequences):
+    pytest.importorskip("numpy")
+    assert count_valid_sequences(conditions, n_trials, min_dist) == n_sequences
+
+def count_by_brute_force(conditions, n_trials, min_dist):
+    # try every condition at every position and only continue valid beginnings
+    def count(order, left):
+        if not any(left.values()):
+            return 1
+        return sum(
+            count(order + [c], {**left, c: left[c] - 1})
+            for c in left
+            if left[c] > 0 and not has_repetitions(order[max(0, len(order) - min_dist):] + [c], min_dist)
+        )
+    return count([], dict.fromkeys(conditions, int(n_trials / len(conditions))))
+
+@pytest.mark.parametrize("conditions,n_trials,min_dist", [
+    ([1,2,3], 12, 1),
+    ([1,2,3,4], 8, 2),
+    ([1,2,3,4], 8, 3),
+    ([1,2,3,4,5], 10, 3),
+    ([1,2,3,4,5], 10, 4),
+])
+def test_sample_sequence(conditions, n_trials, min_dist):
+    pytest.importorskip("numpy")
+    assert count_valid_sequences(conditions, n_trials, min_dist) == count_by_brute_force(conditions, n_trials, min_dist)
+    rng = random.Random(min_dist)
+    for _ in range(100):
+        trials = sample_sequence(conditions, n_trials, min_dist, rng=rng)
+        assert not has_repetitions(trials, min_dist)
+        assert sorted(trials) == sorted(conditions * int(n_trials / len(conditions)))
+
+def test_sample_sequence_infeasible():
+    pytest.importorskip("numpy")
+    with pytest.raises(StopIteration):
+        sample_sequence([1,2,3], 6, 3)
+
+def test_sample_sequence_is_reproducible():
+    pytest.importorskip("numpy")
+    assert sample_sequence([1,2,3], 9, 1, rng=random.Random(5)) == sample_sequence([1,2,3], 9, 1, rng=random.Random(5))
+
+def test_count_valid_sequences_too_many_states(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(sequencegen, "MAX_STATES", 100)
+    with pytest.raises(ValueError):
+        count_valid_sequences([1,2,3,4,5,6], 60, 2)
+
+def test_is_feasible():
+    assert is_feasible([5,5,5], 2) == True
+    assert is_feasible([5,5,5], 3) == False
+    assert is_feasible([3,1,1], 1) == True
+    assert is_feasible([4,1,1], 1) == False
+
 def test_save_and_load_sequence():
     trials = [1,2,3,4]
     fname = 'test_trials.txt'
     save_sequence(trials, fname)
     loaded = load_sequence(fname)
-    assert trials == loaded
\ No newline at end of file
+    assert trials == loaded
+
+@pytest.mark.parametrize("trials", [
+    ["left", "right", "left"],
+    [1.5, 2.5, 1.5],
+])
+def test_save_and_load_text_sequence(trials, tmp_path):
+    fname = tmp_path / "trials.txt"
+    save_sequence(trials, fname)
+    assert load_sequence(fname) == trials
+
+@pytest.mark.parametrize("trials", [
+    [1,2,3,4],
+    ["left", "right", "left"],
+    [],
+    list(range(1000)),
+])
+def test_save_and_load_binary_sequence(trials, tmp_path):
+    fname = tmp_path / "trials.seq"
+    save_sequence(trials, fname, binary=True)
+    assert load_sequence(fname) == trials
+
+def test_save_binary_numpy_sequence(tmp_path):
+    pytest.importorskip("numpy")
+    trials = list(make_sequences(1, [1,2,3], 30, 1, seed=1)[0])  # a list of numpy integers
+    fname = tmp_path / "trials.seq"
+    save_sequence(trials, fname, binary=True)
+    assert load_sequence(fname) == [int(t) for t in trials]
+
+def test_sequence_bank(tmp_path):
+    fname = tmp_path / "bank.seqs"
+    for subject in range(1, 11):
+        for block in range(1, 4):
+            add_to_bank([subject, block, 0], fname, subject, block)
+    assert load_from_bank(fname, 7, 2) == [7, 2, 0]
+    add_to_bank(["left", "right"], fname, 11)  # appending updates the index
+    assert load_from_bank(fname, 11) == ["left", "right"]
+    add_to_bank([1, 2], fname, 7, 2)  # adding the same subject and block replaces it
+    assert load_from_bank(fname, 7, 2) == [1, 2]
+    with pytest.raises(KeyError):
+        load_from_bank(fname, 12)
+
+@pytest.mark.parametrize("n_bytes", [5, 20])  # cut off in the record's header or in its sequence
+def test_sequence_bank_with_incomplete_record(n_bytes, tmp_path):
+    fname = tmp_path / "bank.seqs"
+    add_to_bank([1, 2, 3], fname, 1)
+    with open(fname, "ab") as f:  # a crash while adding subject 2
+        f.write(sequencegen.BANK_RECORD.pack(sequencegen.MAGIC, 2, 1, 100) + b"SEQ")
+        f.truncate(f.tell() - (sequencegen.BANK_RECORD.size + 3) + n_bytes)
+    assert load_from_bank(fname, 1) == [1, 2, 3]
+    with pytest.raises(KeyError):
+        load_from_bank(fname, 2)
+    add_to_bank([4, 5], fname, 2)  # the incomplete record is replaced
+    assert load_from_bank(fname, 2) == [4, 5]
+    assert load_from_bank(fname, 1) == [1, 2, 3]
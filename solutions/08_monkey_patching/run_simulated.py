@@ -1,29 +1,143 @@
-import random
-from unittest.mock import Mock, patch
+import csv
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+import sim
 from experiment import main
 
-def beep():
-    print("beep")
 
-def wait(t):
-    print("Waiting for " + str(t))
+@contextmanager
+def simulated(participant, verbose=True):
+    """Replace PsychoPy in experiment.py with the lightweight objects from sim.py"""
+    sim.VERBOSE = verbose
+    with (
+        patch("experiment.Window", sim.Window),
+        patch("experiment.TextStim", sim.TextStim),
+        patch("experiment.sound.Sound", sim.Sound),
+        patch("experiment.core.wait", sim.wait),
+        patch("experiment.waitKeys", participant.waitKeys),
+        open(os.devnull, "w") as devnull,
+        redirect_stdout(sys.stdout if verbose else devnull),
+    ):
+        yield
 
-def randomKey(keyList, timeStamped):
-    """Pick a random key from the key list and return KeyPress object with random reaction time"""
-    rt = random.random()
-    name = random.choice(keyList)
-    if timeStamped:
-        return [[name, rt]]
-    else:
-        return [name]
+
+def run_simulated(n_sessions=1, rt_mean=0.5, rt_sd=0.1, rt_dist="normal", seed=None, verbose=True):
+    """Run the experiment n_sessions times with the lightweight objects from sim.py
+    instead of PsychoPy and return the responses of every session"""
+    participant = sim.Participant(rt_mean, rt_sd, rt_dist, seed=seed)
+    sessions = []
+    with simulated(participant, verbose):
+        for _ in range(n_sessions):
+            participant.responses = []
+            main()
+            sessions.append(participant.responses)
+    return sessions
+
+
+def simulate_subjects(subjects, out_dir, rt_mean=0.5, rt_sd=0.1, rt_dist="normal", seed=None, fmt="csv"):
+    """Simulate one session per subject and write its responses to out_dir/sub-XX/responses.csv
+    or, if fmt is "parquet", to a Parquet dataset in out_dir/responses that is partitioned
+    by subject. Returns the process id, the number of subjects and the time it took"""
+    tic = time.perf_counter()
+    participant = sim.Participant(rt_mean, rt_sd, rt_dist)
+    columns = {"subject": [], "trial": [], "key": [], "response_time": []}
+    with simulated(participant, verbose=False):
+        for subject in subjects:
+            participant.rng.seed(subject_seed(seed, subject))
+            participant.responses = []
+            main()
+            if fmt == "parquet":
+                for trial, (key, rt) in enumerate(participant.responses, start=1):
+                    for name, value in zip(columns, [subject, trial, key, rt]):
+                        columns[name].append(value)
+            else:
+                write_csv(participant.responses, Path(out_dir) / f"sub-{subject:02d}")
+    if fmt == "parquet":
+        write_parquet(columns, Path(out_dir) / "responses")
+    return os.getpid(), len(subjects), time.perf_counter() - tic
+
+
+def subject_seed(seed, subject):
+    # the same as SeedSequence(seed).spawn(...)[subject], so every subject gets an independent
+    # stream that is reproducible, no matter which worker simulates it
+    child = np.random.SeedSequence(seed, spawn_key=(subject,))
+    return int(child.generate_state(1, dtype=np.uint64)[0])
+
+
+def write_csv(responses, subject_dir):
+    subject_dir.mkdir(parents=True, exist_ok=True)
+    with open(subject_dir / "responses.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["key", "response_time"])
+        writer.writerows(responses)
 
 
-with (
-    patch("experiment.Window"),
-    patch("experiment.TextStim"),
-    patch("experiment.sound.Sound.play", return_value=beep),
-    patch("experiment.core.wait", side_effect=wait),
-    patch("experiment.waitKeys", side_effect=randomKey),
+def write_parquet(columns, dataset_dir):
+    # all subjects of one worker are written at once, with typed columns. Workers simulate
+    # different subjects, so each one only replaces the partitions of its own subjects
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Writing Parquet files requires pyarrow: pip install pyarrow")
+    schema = pa.schema(
+        [("subject", pa.int32()), ("trial", pa.int32()), ("key", pa.string()), ("response_time", pa.float64())]
+    )
+    pq.write_to_dataset(
+        pa.table(columns, schema=schema),
+        dataset_dir,
+        partition_cols=["subject"],
+        existing_data_behavior="delete_matching",  # rerunning a subject replaces its old data
+    )
+
+
+def simulate_cohort(
+    subjects, out_dir="data", workers=1, rt_mean=0.5, rt_sd=0.1, rt_dist="normal", seed=None, fmt="csv"
 ):
-    # kb.waitKeys.return_value = randomKey
-    main()
+    """Spread the subjects over a pool of worker processes and return the
+    throughput of every worker as (process id, number of subjects, seconds)"""
+    seed = np.random.SeedSequence(seed).entropy  # without a seed, all workers must share the same entropy
+    chunks = [subjects[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(simulate_subjects, chunk, out_dir, rt_mean, rt_sd, rt_dist, seed, fmt)
+            for chunk in chunks
+            if chunk
+        ]
+        return [f.result() for f in futures]
+
+
+def parse_subjects(subjects):
+    # "1-500" -> [1, 2, ..., 500], "7" -> [7]
+    first, _, last = subjects.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--subjects", type=parse_subjects, help="simulate a cohort, e.g. 1-500")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out-dir", default="data")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--rt-mean", type=float, default=0.5)
+    parser.add_argument("--rt-sd", type=float, default=0.1)
+    parser.add_argument("--rt-dist", choices=["normal", "lognormal", "exgauss"], default="normal")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    if args.subjects:
+        stats = simulate_cohort(
+            args.subjects, args.out_dir, args.workers, args.rt_mean, args.rt_sd, args.rt_dist, args.seed, args.format
+        )
+        for pid, n, secs in stats:
+            print(f"Worker {pid}: {n} subjects in {secs:.2f} s ({n / secs:.0f} subjects/s)")
+    else:
+        run_simulated(args.sessions, args.rt_mean, args.rt_sd, args.rt_dist, args.seed, not args.quiet)
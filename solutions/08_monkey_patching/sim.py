@@ -0,0 +1,77 @@
+"""Lightweight stand-ins for the PsychoPy objects used in experiment.py.
+They do nothing (except for printing when VERBOSE is True) and never wait,
+which makes them much cheaper than Mocks when simulating many sessions."""
+import math
+import random
+
+VERBOSE = True  # print "beep" and the wait times like run_simulated did
+
+
+class Window:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def flip(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TextStim:
+    def __init__(self, win, text="", **kwargs):
+        self.text = text
+
+    def draw(self):
+        pass
+
+
+class Sound:
+    def __init__(self, value="C", secs=0.5, **kwargs):
+        self.value, self.secs = value, secs
+
+    def play(self):
+        if VERBOSE:
+            print("beep")
+
+
+def wait(secs):
+    if VERBOSE:
+        print("Waiting for " + str(secs))
+
+
+class Participant:
+    """Simulated participant that presses a random key from the keyList.
+    Response times are drawn from a normal or log-normal distribution with the given
+    mean and standard deviation or from an ex-Gaussian distribution (a normal
+    distribution plus an exponential tail with mean tau). Every response is stored in
+    `responses` as a (key, response time) tuple."""
+
+    def __init__(self, rt_mean=0.5, rt_sd=0.1, rt_dist="normal", tau=0.1, seed=None):
+        if rt_dist not in ["normal", "lognormal", "exgauss"]:
+            raise ValueError("rt_dist must be 'normal', 'lognormal' or 'exgauss'!")
+        self.rt_mean, self.rt_sd, self.rt_dist, self.tau = rt_mean, rt_sd, rt_dist, tau
+        self.rng = random.Random(seed)
+        self.responses = []
+
+    def response_time(self):
+        if self.rt_dist == "lognormal":  # with the given mean and standard deviation
+            sigma = math.sqrt(math.log(1 + self.rt_sd**2 / self.rt_mean**2))
+            return self.rng.lognormvariate(math.log(self.rt_mean) - sigma**2 / 2, sigma)
+        rt = self.rng.gauss(self.rt_mean, self.rt_sd)
+        if self.rt_dist == "exgauss":
+            rt += self.rng.expovariate(1 / self.tau)
+        return max(rt, 0.0)
+
+    def waitKeys(self, keyList, timeStamped=False):
+        key, rt = self.rng.choice(keyList), self.response_time()
+        self.responses.append((key, rt))
+        if timeStamped:
+            return [[key, rt]]
+        return [key]
@@ -81,16 +81,38 @@ with open("test_config.json", "w") as f:
 # !posner 1 test_config.json --overwrite --test
 
 # %% [markdown]
-# We can use the data generated by this test to do a sanity check on our data analysis pipeline. First, we load all blocks and concatenate them into one data frame
+# We can use the data generated by this test to do a sanity check on our data analysis pipeline. First, we load all blocks of all subjects and concatenate them into one data frame.
+# With many subjects, this is worth doing efficiently: the files are read in parallel by a pool of threads, the column types are fixed instead of being guessed for every file, and the combined data frame is cached until one of the files changes.
 
 # %%
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import pandas as pd
 
-blocks = []
-for f in Path('data/sub-01').glob('block_*.csv'):
-    blocks.append(pd.read_csv(f))
-df = pd.concat(blocks)
+SCHEMA = {"side": "category", "valid": "bool", "response": "category", "response_time": "float64"}
+
+def read_block(fname):
+    block = pd.read_csv(fname, dtype=SCHEMA)
+    block["subject"] = int(fname.parent.name.split("-")[1])  # e.g. sub-01
+    block["block"] = int(fname.stem.split("_")[1])  # e.g. block_1.csv
+    return block
+
+@lru_cache(maxsize=8)
+def _load_blocks(files):
+    # files contains the modification times so a changed file invalidates the cache
+    with ThreadPoolExecutor() as pool:
+        blocks = list(pool.map(read_block, [f for f, _ in files]))
+    df = pd.concat(blocks, ignore_index=True)
+    for col in ["side", "response"]:
+        df[col] = df[col].astype("category")  # concat turns differing categories into objects
+    return df
+
+def load_study(root_dir="data"):
+    files = sorted(Path(root_dir).glob("sub-*/block_*.csv"))
+    return _load_blocks(tuple((f, f.stat().st_mtime_ns) for f in files)).copy()
+
+df = load_study("data")
 df.head()
 
 # %% [markdown]
@@ -0,0 +1,94 @@
+import os
+import json
+import timeit
+from pathlib import Path
+from unittest import mock
+import pytest
+from psychopy import core
+from posner.experiment import (
+    run_trial,
+    run_block,
+    run_experiment,
+    draw_fixation,
+    draw_frames,
+    draw_stimulus,
+)
+
+# The benchmarks are opt-in: run them with `pytest --benchmark`. They measure the Python
+# overhead of drawing and running trials with psychopy mocked, on the machine that recorded
+# the baselines. Run `POSNER_UPDATE_BASELINES=1 pytest --benchmark` there to store the
+# current timings in benchmark_baselines.json and commit that file
+pytestmark = pytest.mark.benchmark
+BASELINE_FILE = Path(__file__).parent / "benchmark_baselines.json"
+UPDATE_BASELINES = bool(os.environ.get("POSNER_UPDATE_BASELINES"))
+THRESHOLD = 3  # fail if a benchmark gets this many times slower, timings of mocked calls are noisy
+
+
+@pytest.fixture(scope="module")
+def baselines():
+    if BASELINE_FILE.exists():
+        baselines = json.loads(BASELINE_FILE.read_text())
+    else:
+        baselines = {}
+    yield baselines
+    if UPDATE_BASELINES:
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=4))
+
+
+@pytest.fixture
+def mock_wait():
+    # measure the overhead of the code, not the deliberate waits
+    with mock.patch("posner.experiment.core.wait") as mock_wait:
+        yield mock_wait
+
+
+def check_benchmark(name, func, baselines, number=100):
+    if name not in baselines and not UPDATE_BASELINES:
+        pytest.fail(f"No baseline for {name}, run with POSNER_UPDATE_BASELINES=1 to record one")
+    seconds = min(timeit.repeat(func, number=number, repeat=7)) / number  # the fastest run is the least noisy
+    if UPDATE_BASELINES:
+        baselines[name] = seconds
+        return
+    assert seconds < baselines[name] * THRESHOLD, (
+        f"{name} took {seconds * 1000:.3f} ms, baseline is {baselines[name] * 1000:.3f} ms"
+    )
+
+
+def test_benchmark_draw(
+    baselines, create_config, mock_window, mock_circle, mock_rect
+):
+    check_benchmark("draw_fixation", lambda: draw_fixation(mock_window, create_config), baselines)
+    check_benchmark(
+        "draw_frames", lambda: draw_frames(mock_window, create_config, highlight="left"), baselines
+    )
+    check_benchmark(
+        "draw_stimulus", lambda: draw_stimulus(mock_window, create_config, side="left"), baselines
+    )
+
+
+def test_benchmark_run_trial(
+    baselines, create_config, mock_window, mock_circle, mock_rect, mock_waitKeys, mock_wait
+):
+    clock = core.Clock()
+    check_benchmark(
+        "run_trial",
+        lambda: run_trial(mock_window, clock, side="left", valid=True, config=create_config),
+        baselines,
+    )
+
+
+def test_benchmark_run_block(
+    baselines, create_config, mock_window, mock_circle, mock_rect, mock_waitKeys, mock_wait
+):
+    clock = core.Clock()
+    check_benchmark("run_block", lambda: run_block(mock_window, clock, create_config), baselines)
+
+
+def test_benchmark_run_experiment(
+    baselines, write_config, mock_window, mock_circle, mock_rect, mock_text, mock_waitKeys, mock_wait
+):
+    # run_experiment refuses to overwrite existing data, so every run gets a new subject
+    subjects = iter(range(1, 1000))
+    check_benchmark(
+        "run_experiment", lambda: run_experiment(next(subjects), write_config), baselines, number=5
+    )